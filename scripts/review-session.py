@@ -10,16 +10,29 @@ from __future__ import annotations
 import argparse
 import csv
 import datetime as dt
+import functools
+import heapq
+import io
 import json
+import mmap
 import os
 import re
 import statistics
+import string
 import subprocess
 import sys
 import uuid
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, NamedTuple, TextIO, Tuple
+
+try:
+    # Optional fast JSON codec; the stdlib json module is used when absent.
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 DOC_REFS = {
     "agtrace": "https://github.com/lanegrid/agtrace",
@@ -29,7 +42,58 @@ DOC_REFS = {
 }
 
 RETRY_TOKENS = ("retry", "again", "failed", "error", "didn't work", "did not work")
+RETRY_RE = re.compile("|".join(map(re.escape, RETRY_TOKENS)))
+INSTALL_HINT = "Install requirements:\n  npm install -g @lanegrid/agtrace ccusage\n"
 ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+RUN_TYPE_THRESHOLDS: Dict[str, Dict[str, float]] = {
+    "smoke": {
+        "warn_uncached_tokens": 50.0,
+        "fail_uncached_tokens": 500.0,
+        "warn_cost_usd": 0.02,
+        "fail_cost_usd": 0.05,
+        "warn_retry_loops": 1.0,
+        "fail_retry_loops": 2.0,
+    },
+    "workflow": {
+        "warn_uncached_tokens": 50000.0,
+        "fail_uncached_tokens": 120000.0,
+        "warn_cost_usd": 10.0,
+        "fail_cost_usd": 25.0,
+        "warn_retry_loops": 3.0,
+        "fail_retry_loops": 6.0,
+    },
+    "real": {
+        "warn_uncached_tokens": 120000.0,
+        "fail_uncached_tokens": 300000.0,
+        "warn_cost_usd": 20.0,
+        "fail_cost_usd": 50.0,
+        "warn_retry_loops": 4.0,
+        "fail_retry_loops": 8.0,
+    },
+}
+
+TREND_HEADER: Tuple[str, ...] = (
+    "date",
+    "project",
+    "source",
+    "run_type",
+    "session_reference_id",
+    "session_id",
+    "uncached_tokens",
+    "total_tokens",
+    "input_tokens",
+    "output_tokens",
+    "tool_calls",
+    "retry_loops",
+    "efficiency",
+    "reliability",
+    "composite",
+    "estimated_cost_usd",
+    "verdict",
+    "report_path",
+)
 
 
 class ToolError(RuntimeError):
@@ -43,10 +107,20 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--run-type", default="real", choices=["smoke", "workflow", "real"], help="Run category")
     p.add_argument("--project", help="Project slug/name for trend grouping")
     p.add_argument("--trend-file", help="Optional trend CSV path for baseline deltas and append")
+    p.add_argument(
+        "--force-migrate",
+        action="store_true",
+        help="Rewrite the trend CSV to the current column order even when its header is compatible",
+    )
     p.add_argument("--session-id", help="Explicit session id to analyze (avoids latest-session selection)")
     p.add_argument("--session-reference-id", help="Stable caller-provided reference id for this review run")
     p.add_argument("--format", default="json", choices=["json", "markdown"], help="Output format")
     p.add_argument("--out", help="Optional output path")
+    p.add_argument(
+        "--include-raw-sources",
+        action="store_true",
+        help="Embed raw agtrace/ccusage output in the report (JSON raw_sources key, markdown appendix)",
+    )
     p.add_argument("--max-tokens", type=int, help="Optional token budget")
     p.add_argument("--max-cost-usd", type=float, help="Optional cost budget")
     p.add_argument("--timebox-minutes", type=float, help="Optional time budget")
@@ -68,34 +142,96 @@ def normalize_slug(raw: str) -> str:
 
 
 def normalize_text(s: str) -> str:
-    return re.sub(r"\s+", " ", s.strip().lower())
+    # split() drops leading/trailing whitespace and collapses runs in one pass.
+    return " ".join(s.lower().split())
+
+
+def find_key(root: Any, key: str):
+    """Yield values stored under key in any nested dict, in document order."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if key in node:
+                yield node[key]
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            continue
+        # Push in reverse so the first child is visited next (pre-order).
+        stack.extend(v for v in reversed(children) if isinstance(v, (dict, list)))
 
 
-def walk(node: Any):
-    yield node
-    if isinstance(node, dict):
-        for v in node.values():
-            yield from walk(v)
-    elif isinstance(node, list):
-        for v in node:
-            yield from walk(v)
+def _dig(node: Any, *keys: str, default: Any = None) -> Any:
+    """Follow nested dict keys, returning default at the first missing level."""
+    for key in keys:
+        node = node.get(key) if isinstance(node, dict) else None
+        if node is None:
+            return default
+    return node
 
 
 def clamp(v: float, lo: float = 0.0, hi: float = 100.0) -> float:
     return max(lo, min(hi, v))
 
 
+def clean_tool_output(text: str) -> str:
+    if "\x1b" in text:
+        text = ANSI_ESCAPE_RE.sub("", text)
+    if "\r" in text:
+        text = text.replace("\r", "")
+    return text.strip()
+
+
+def loads_json(data: str | bytes) -> Any:
+    """json.loads via orjson when installed; stdlib decides anything orjson rejects."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+def loads_single_document(text: str) -> Any:
+    """Parse text that is exactly one JSON document with orjson.
+
+    Raises ValueError when orjson is unavailable or the text carries noise or
+    several documents; callers then fall back to the scanning decoder.
+    """
+    if orjson is None or text.lstrip()[:1] not in ("{", "["):
+        raise ValueError("not a single JSON document")
+    return orjson.loads(text)
+
+
+class ToolPayload(dict):
+    """A parsed tool JSON object that was the entire (cleaned) tool output.
+
+    raw_text keeps that output so reports can embed it verbatim instead of
+    re-serializing the object.
+    """
+
+    raw_text: str = ""
+
+
+def with_raw_text(doc: Any, text: str) -> Any:
+    if not isinstance(doc, dict):
+        return doc
+    payload = ToolPayload(doc)
+    payload.raw_text = text
+    return payload
+
+
 def maybe_json(text: str) -> Any:
-    text = ANSI_ESCAPE_RE.sub("", text).replace("\r", "").strip()
-    docs = extract_json_documents(text)
-    return docs[0]
+    text = clean_tool_output(text)
+    # Only the first document is needed; stop decoding once it is found.
+    docs, whole = parse_tool_documents(text, first_only=True)
+    return with_raw_text(docs[0], text) if whole else docs[0]
 
 
-def extract_json_documents(text: str) -> List[Any]:
-    if not text:
-        raise ValueError("empty output")
+def iter_json_spans(text: str) -> Iterator[Tuple[Any, int, int]]:
     decoder = json.JSONDecoder()
-    docs: List[Any] = []
     cursor = 0
     while cursor < len(text):
         obj_start = text.find("{", cursor)
@@ -109,12 +245,32 @@ def extract_json_documents(text: str) -> List[Any]:
         except json.JSONDecodeError:
             cursor = start + 1
             continue
-        docs.append(doc)
+        yield doc, start, end
         cursor = end
 
+
+def parse_tool_documents(text: str, first_only: bool = False) -> Tuple[List[Any], bool]:
+    """Decode the JSON documents in stripped tool output.
+
+    Returns the documents and whether the text was exactly one document.
+    """
+    if not text:
+        raise ValueError("empty output")
+    try:
+        return [loads_single_document(text)], True
+    except ValueError:
+        pass
+    docs: List[Any] = []
+    whole = False
+    for doc, start, end in iter_json_spans(text):
+        if not docs:
+            whole = start == 0 and end == len(text)
+        docs.append(doc)
+        if first_only:
+            break
     if not docs:
         raise ValueError("no JSON found in tool output")
-    return docs
+    return docs, whole
 
 
 def run_json_command(cmd: List[str]) -> Any:
@@ -159,28 +315,40 @@ def detect_source(args: argparse.Namespace) -> str:
     return "claude"
 
 
-def agtrace_base_cmd(args: argparse.Namespace) -> List[str]:
-    cmd = ["agtrace"]
-    script_repo_root = Path(__file__).resolve().parents[1]
-    data_dir = args.agtrace_data_dir or os.environ.get("AGTRACE_PATH") or str(script_repo_root / ".agtrace")
-    cmd.extend(["--data-dir", data_dir])
+@functools.lru_cache(maxsize=None)
+def default_agtrace_data_dir() -> str:
+    return str(Path(__file__).resolve().parents[1] / ".agtrace")
+
+
+def agtrace_location(args: argparse.Namespace) -> Tuple[str, str]:
+    data_dir = args.agtrace_data_dir or os.environ.get("AGTRACE_PATH") or default_agtrace_data_dir()
     project_root = args.project_root or os.getcwd()
-    cmd.extend(["--project", project_root])
-    return cmd
+    return data_dir, project_root
+
+
+def agtrace_base_cmd(args: argparse.Namespace) -> List[str]:
+    data_dir, project_root = agtrace_location(args)
+    return ["agtrace", "--data-dir", data_dir, "--project", project_root]
+
+
+# (data_dir, project_root) pairs already probed or initialized in this process.
+_AGTRACE_READY: set[Tuple[str, str]] = set()
 
 
 def ensure_agtrace_ready(args: argparse.Namespace) -> None:
+    location = agtrace_location(args)
+    if location in _AGTRACE_READY:
+        return
     base = agtrace_base_cmd(args)
     probe_cmd = base + ["session", "list", "--limit", "1", "--format", "json"]
     code, _, _ = run_command(probe_cmd)
-    if code == 0:
-        return
-
-    # Initialize once if not ready.
-    init_cmd = base + ["init", "--format", "json"]
-    init_code, _, init_err = run_command(init_cmd)
-    if init_code != 0:
-        raise ToolError(f"agtrace init failed: {init_err.strip()}")
+    if code != 0:
+        # Initialize once if not ready.
+        init_cmd = base + ["init", "--format", "json"]
+        init_code, _, init_err = run_command(init_cmd)
+        if init_code != 0:
+            raise ToolError(f"agtrace init failed: {init_err.strip()}")
+    _AGTRACE_READY.add(location)
 
 
 def agtrace_session(args: argparse.Namespace, provider: str, session_id: str | None) -> Dict[str, Any]:
@@ -189,7 +357,7 @@ def agtrace_session(args: argparse.Namespace, provider: str, session_id: str | N
     resolved_id = session_id
     if not resolved_id:
         listed = run_json_command(base + ["session", "list", "--provider", provider, "--limit", "1", "--format", "json"])
-        sessions = listed.get("content", {}).get("sessions", [])
+        sessions = _dig(listed, "content", "sessions", default=[])
         if not sessions:
             raise ToolError(f"no {provider} sessions found in agtrace index")
         resolved_id = sessions[0].get("id")
@@ -206,7 +374,7 @@ def agtrace_session(args: argparse.Namespace, provider: str, session_id: str | N
     except Exception as exc:
         raise ToolError(f"invalid JSON from {' '.join(show_cmd)}") from exc
 
-    shown_provider = shown.get("content", {}).get("header", {}).get("provider")
+    shown_provider = _dig(shown, "content", "header", "provider")
     if shown_provider and shown_provider != provider:
         raise ToolError(
             f"session id {resolved_id} is provider={shown_provider}, expected provider={provider}"
@@ -215,14 +383,15 @@ def agtrace_session(args: argparse.Namespace, provider: str, session_id: str | N
 
 
 def parse_agtrace_show_output(text: str) -> Dict[str, Any]:
-    docs = extract_json_documents(text)
+    text = text.strip()
+    docs, whole = parse_tool_documents(text)
     primary = docs[0]
     if not isinstance(primary, dict):
         raise ValueError("agtrace session show returned a non-object JSON payload")
 
     extra_streams = [doc for doc in docs[1:] if isinstance(doc, dict)]
     if not extra_streams:
-        return primary
+        return with_raw_text(primary, text) if whole else primary
 
     content = primary.setdefault("content", {})
     existing = content.get("additional_streams", [])
@@ -234,7 +403,7 @@ def parse_agtrace_show_output(text: str) -> Dict[str, Any]:
 
 def agtrace_stream_payloads(show_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     streams = [show_json]
-    extras = show_json.get("content", {}).get("additional_streams", [])
+    extras = _dig(show_json, "content", "additional_streams", default=[])
     if isinstance(extras, list):
         streams.extend(stream for stream in extras if isinstance(stream, dict))
     return streams
@@ -247,11 +416,31 @@ def pick_most_common(items: List[str]) -> str | None:
     return counts.most_common(1)[0][0]
 
 
+def iter_lines_containing(path: str, needle: bytes) -> Iterator[bytes]:
+    """Yield each line of a file that contains needle, scanning via mmap."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                hit = mm.find(needle, pos)
+                if hit == -1:
+                    return
+                line_break = mm.rfind(b"\n", pos, hit)
+                start = line_break + 1 if line_break != -1 else pos
+                end = mm.find(b"\n", hit)
+                if end == -1:
+                    end = size
+                yield mm[start:end]
+                pos = end + 1
+
+
 def infer_codex_model_from_logs(agtrace_show: Dict[str, Any]) -> str | None:
     candidates: List[str] = []
     for stream in agtrace_stream_payloads(agtrace_show):
-        header = stream.get("content", {}).get("header", {})
-        log_files = header.get("log_files", [])
+        log_files = _dig(stream, "content", "header", "log_files", default=[])
         if not isinstance(log_files, list):
             continue
 
@@ -259,27 +448,26 @@ def infer_codex_model_from_logs(agtrace_show: Dict[str, Any]) -> str | None:
             if not isinstance(log_file, str) or not os.path.isfile(log_file):
                 continue
             try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
+                # Most log records never mention a model; only lines containing
+                # the key are sliced out and parsed.
+                for line in iter_lines_containing(log_file, b'"model"'):
+                    # Only object/array records can carry a "model" key; skip
+                    # prose and error lines that mention it without parsing.
+                    if line.lstrip()[:1] not in (b"{", b"["):
+                        continue
+                    try:
+                        obj = loads_json(line)
+                    except ValueError:
+                        continue
+                    for v in find_key(obj, "model"):
+                        if not isinstance(v, str):
                             continue
-                        try:
-                            obj = json.loads(line)
-                        except json.JSONDecodeError:
+                        model = v.strip()
+                        # Restrict to model-id-like tokens, not prose labels.
+                        if " " in model:
                             continue
-                        for n in walk(obj):
-                            if not isinstance(n, dict):
-                                continue
-                            v = n.get("model")
-                            if not isinstance(v, str):
-                                continue
-                            model = v.strip()
-                            # Restrict to model-id-like tokens, not prose labels.
-                            if " " in model:
-                                continue
-                            if model.startswith("gpt-") or model.startswith("o") or "codex" in model:
-                                candidates.append(model)
+                        if model.startswith("gpt-") or model.startswith("o") or "codex" in model:
+                            candidates.append(model)
             except OSError:
                 continue
 
@@ -293,46 +481,49 @@ def summarize_from_agtrace(show_json: Dict[str, Any]) -> Dict[str, Any]:
     messages = 0
     tool_calls = 0
     retry_loops = 0
-    user_queries: List[str] = []
+    user_query_counts: Counter[str] = Counter()
+    # Bind globals used per turn/step to locals for the hot loop below.
+    normalize = normalize_text
+    retry_search = RETRY_RE.search
 
     for stream in agtrace_stream_payloads(show_json):
         content = stream.get("content", {})
-        turns = content.get("turns", []) or []
+        turns = content.get("turns") or []
         for turn in turns:
-            metrics = turn.get("metrics", {}) or {}
-            input_tokens += int(metrics.get("input_tokens", 0) or 0)
-            output_tokens += int(metrics.get("output_tokens", 0) or 0)
-            cache_read_tokens += int(metrics.get("cache_read_tokens", 0) or 0)
+            metrics = turn.get("metrics")
+            if metrics:
+                metrics_get = metrics.get
+                input_tokens += int(metrics_get("input_tokens") or 0)
+                output_tokens += int(metrics_get("output_tokens") or 0)
+                cache_read_tokens += int(metrics_get("cache_read_tokens") or 0)
 
             user_query = turn.get("user_query")
             if isinstance(user_query, str) and user_query.strip():
                 messages += 1
-                norm = normalize_text(user_query)
-                user_queries.append(norm)
-                if any(tok in norm for tok in RETRY_TOKENS):
+                norm = normalize(user_query)
+                user_query_counts[norm] += 1
+                if retry_search(norm):
                     retry_loops += 1
 
-            for step in turn.get("steps", []) or []:
+            steps = turn.get("steps") or []
+            for step in steps:
                 kind = step.get("kind")
                 if kind == "Message":
                     messages += 1
                     text = step.get("text")
-                    if isinstance(text, str):
-                        norm = normalize_text(text)
-                        if any(tok in norm for tok in RETRY_TOKENS):
-                            retry_loops += 1
+                    if isinstance(text, str) and retry_search(normalize(text)):
+                        retry_loops += 1
                 elif kind == "ToolCall":
                     tool_calls += 1
                 elif kind == "ToolCallSequence":
-                    tool_calls += int(step.get("count", 0) or 0)
+                    tool_calls += int(step.get("count") or 0)
 
     total_tokens = input_tokens + output_tokens + cache_read_tokens
     avg_tokens_per_message = (total_tokens / messages) if messages > 0 else 0.0
 
-    repeated_context_ratio = 0.0
-    if user_queries:
-        unique = len(set(user_queries))
-        repeated_context_ratio = max(0.0, min(1.0, 1.0 - (unique / len(user_queries))))
+    # 1 - unique/total is already within [0, 1) for any non-empty count.
+    total_queries = sum(user_query_counts.values())
+    repeated_context_ratio = (1.0 - len(user_query_counts) / total_queries) if total_queries else 0.0
 
     return {
         "input_tokens": int(input_tokens),
@@ -436,14 +627,14 @@ def infer_model_used(source: str, agtrace_show: Dict[str, Any], ccusage_data: Di
         codex_model = infer_codex_model_from_logs(agtrace_show)
         if codex_model:
             return codex_model
-        header_model = agtrace_show.get("content", {}).get("header", {}).get("model")
+        header_model = _dig(agtrace_show, "content", "header", "model")
         if isinstance(header_model, str):
             normalized = header_model.strip()
             if normalized and "claude" not in normalized.lower():
                 return normalized
         return "unknown"
 
-    header_model = agtrace_show.get("content", {}).get("header", {}).get("model")
+    header_model = _dig(agtrace_show, "content", "header", "model")
     if isinstance(header_model, str) and header_model.strip():
         return header_model.strip()
     return "unknown"
@@ -514,120 +705,155 @@ def score_summary(
     budget: Dict[str, Any] | None,
     source_reliability: float,
 ) -> Dict[str, Any]:
-    total_tokens = float(summary["total_tokens"])
-    uncached_tokens = float(summary.get("uncached_tokens", total_tokens))
-    cache_read_tokens = float(summary.get("cache_read_tokens", 0.0))
-    avg_tpm = float(summary.get("avg_tokens_per_message", 0.0))
-    retry_loops = float(summary.get("retry_loops", 0))
-    tool_calls = float(summary.get("tool_calls", 0))
-    repeated = float(summary.get("repeated_context_ratio", 0.0))
-    effective_tokens = uncached_tokens + (cache_read_tokens * 0.1)
+    return score_summaries([summary], [budget], source_reliability)[0]
 
-    eff = 100.0
-    eff -= min(40.0, (effective_tokens / 20000.0) * 40.0)
-    uncached_avg_tpm = (uncached_tokens / max(1.0, float(summary.get("messages", 0) or 0)))
-    eff -= min(20.0, max(0.0, (uncached_avg_tpm - 250.0) / 500.0 * 20.0))
-    eff -= min(20.0, retry_loops * 6.0)
-    eff -= min(10.0, max(0.0, tool_calls - 15.0) * 0.5)
-    eff -= repeated * 10.0
 
-    if budget is not None:
-        adh = budget.get("adherence", {})
-        over_tokens = float(adh.get("tokens_over_budget", 0))
-        over_cost = float(adh.get("cost_over_budget_usd", 0.0))
-        over_minutes = float(adh.get("minutes_over_budget", 0.0))
-        eff -= min(20.0, over_tokens / 1000.0 * 4.0)
-        eff -= min(10.0, over_cost * 100.0)
-        eff -= min(10.0, over_minutes / 10.0 * 5.0)
+def score_summaries(
+    summaries: List[Dict[str, Any]],
+    budgets: List[Dict[str, Any] | None],
+    source_reliability: float,
+) -> List[Dict[str, Any]]:
+    """Score many summaries from the same source in one pass.
+
+    Terms that depend only on the source are computed once per batch.
+    budgets must hold one entry (or None) per summary.
+    """
+    if len(summaries) != len(budgets):
+        raise ValueError(
+            f"score_summaries needs one budget per summary "
+            f"(got {len(summaries)} summaries, {len(budgets)} budgets)"
+        )
+    rel_base = source_reliability * 80.0
+    medium_tier = source_reliability >= 0.75
+    high_tier = source_reliability >= 0.9
+
+    scored: List[Dict[str, Any]] = []
+    for summary, budget in zip(summaries, budgets):
+        total_tokens = float(summary["total_tokens"])
+        uncached_tokens = float(summary.get("uncached_tokens", total_tokens))
+        cache_read_tokens = float(summary.get("cache_read_tokens", 0.0))
+        retry_loops = float(summary.get("retry_loops", 0))
+        tool_calls = float(summary.get("tool_calls", 0))
+        repeated = float(summary.get("repeated_context_ratio", 0.0))
+        effective_tokens = uncached_tokens + (cache_read_tokens * 0.1)
+        uncached_avg_tpm = (uncached_tokens / max(1.0, float(summary.get("messages", 0) or 0)))
+
+        # One left-to-right expression; same operation order as applying each
+        # penalty in turn, so results are bit-identical.
+        eff = (
+            100.0
+            - min(40.0, (effective_tokens / 20000.0) * 40.0)
+            - min(20.0, max(0.0, (uncached_avg_tpm - 250.0) / 500.0 * 20.0))
+            - min(20.0, retry_loops * 6.0)
+            - min(10.0, max(0.0, tool_calls - 15.0) * 0.5)
+            - repeated * 10.0
+        )
 
-    eff = clamp(eff)
+        if budget is not None:
+            adh = budget.get("adherence", {})
+            eff = (
+                eff
+                - min(20.0, float(adh.get("tokens_over_budget", 0)) / 1000.0 * 4.0)
+                - min(10.0, float(adh.get("cost_over_budget_usd", 0.0)) * 100.0)
+                - min(10.0, float(adh.get("minutes_over_budget", 0.0)) / 10.0 * 5.0)
+            )
 
-    has_token_signal = 1.0 if total_tokens > 0 else 0.0
-    rel = (source_reliability * 80.0) + (has_token_signal * 20.0)
-    rel = clamp(rel)
+        eff = clamp(eff)
 
-    quality_est = clamp(100.0 - (retry_loops * 8.0) - (repeated * 25.0))
-    composite = clamp((0.45 * quality_est) + (0.35 * eff) + (0.20 * rel))
+        has_token_signal = 1.0 if total_tokens > 0 else 0.0
+        rel = clamp(rel_base + (has_token_signal * 20.0))
 
-    confidence = "low"
-    if source_reliability >= 0.75 and total_tokens > 0:
-        confidence = "medium"
-    if source_reliability >= 0.9 and total_tokens > 10000:
-        confidence = "high"
+        quality_est = clamp(100.0 - (retry_loops * 8.0) - (repeated * 25.0))
+        composite = clamp((0.45 * quality_est) + (0.35 * eff) + (0.20 * rel))
 
-    return {
-        "efficiency": round(eff, 2),
-        "reliability": round(rel, 2),
-        "quality_estimate": round(quality_est, 2),
-        "composite": round(composite, 2),
-        "confidence": confidence,
-        "score_method": "tool-integrated-v2-uncached-weighted",
-    }
+        confidence = "low"
+        if medium_tier and total_tokens > 0:
+            confidence = "medium"
+        if high_tier and total_tokens > 10000:
+            confidence = "high"
+
+        scored.append({
+            "efficiency": round(eff, 2),
+            "reliability": round(rel, 2),
+            "quality_estimate": round(quality_est, 2),
+            "composite": round(composite, 2),
+            "confidence": confidence,
+            "score_method": "tool-integrated-v2-uncached-weighted",
+        })
+    return scored
+
+
+class DriverRow(NamedTuple):
+    driver: str
+    impact: int
+    details: str
 
 
 def build_drivers(summary: Dict[str, Any]) -> List[Dict[str, Any]]:
-    drivers: List[Tuple[str, int, str]] = []
+    drivers: List[DriverRow] = []
     total = int(summary["total_tokens"])
     uncached = int(summary.get("uncached_tokens", total))
     cache_read = int(summary.get("cache_read_tokens", 0))
-    messages = max(1, int(summary.get("messages", 0) or 0))
+    raw_messages = summary.get("messages", 0)
+    messages = max(1, int(raw_messages or 0))
     uncached_avg = float(uncached) / float(messages)
     tools = int(summary.get("tool_calls", 0))
     retries = int(summary.get("retry_loops", 0))
     repeated = float(summary.get("repeated_context_ratio", 0.0))
 
-    drivers.append((
+    drivers.append(DriverRow(
         "Session size",
         uncached,
         f"Uncached tokens were {uncached} (of {total} total), the primary controllable token driver.",
     ))
 
     if cache_read > 0:
-        drivers.append((
+        drivers.append(DriverRow(
             "Cache read volume",
             int(cache_read * 0.1),
             f"Cache-read tokens were {cache_read}; they inflate totals but are weighted lower for optimization scoring.",
         ))
 
     if uncached_avg > 400:
-        impact = int((uncached_avg - 400) * max(1, summary.get("messages", 0) * 0.2))
-        drivers.append((
+        impact = int((uncached_avg - 400) * max(1, raw_messages * 0.2))
+        drivers.append(DriverRow(
             "High tokens per message",
             max(0, impact),
             f"Average uncached tokens/message was {uncached_avg:.1f}; longer turns increase controllable token spend.",
         ))
 
     if retries > 0:
-        drivers.append((
+        drivers.append(DriverRow(
             "Retry/rewrite loops",
             retries * 350,
             f"Detected {retries} retry-like turns, which likely repeated context and output.",
         ))
 
     if tools > 20:
-        drivers.append((
+        drivers.append(DriverRow(
             "High tool-call volume",
             (tools - 20) * 120,
             f"Detected {tools} tool-call markers; orchestration overhead can amplify total tokens.",
         ))
 
     if repeated > 0.15:
-        drivers.append((
+        drivers.append(DriverRow(
             "Repeated context",
             int(repeated * total * 0.4),
             f"Repeated-context ratio was {repeated:.2f}; repeated prompts likely inflated usage.",
         ))
 
-    drivers.sort(key=lambda x: x[1], reverse=True)
+    top = heapq.nlargest(5, drivers, key=attrgetter("impact"))
 
-    out = []
-    for idx, (driver, impact, details) in enumerate(drivers[:5], start=1):
-        out.append({
+    out = [
+        {
             "rank": idx,
-            "driver": driver,
-            "estimated_token_impact": int(max(0, impact)),
-            "details": details,
-        })
+            "driver": row.driver,
+            "estimated_token_impact": int(max(0, row.impact)),
+            "details": row.details,
+        }
+        for idx, row in enumerate(top, start=1)
+    ]
 
     if not out:
         out = [{
@@ -691,32 +917,7 @@ def build_recommendations(summary: Dict[str, Any], budget: Dict[str, Any] | None
 
 
 def run_type_thresholds(run_type: str) -> Dict[str, float]:
-    if run_type == "smoke":
-        return {
-            "warn_uncached_tokens": 50.0,
-            "fail_uncached_tokens": 500.0,
-            "warn_cost_usd": 0.02,
-            "fail_cost_usd": 0.05,
-            "warn_retry_loops": 1.0,
-            "fail_retry_loops": 2.0,
-        }
-    if run_type == "workflow":
-        return {
-            "warn_uncached_tokens": 50000.0,
-            "fail_uncached_tokens": 120000.0,
-            "warn_cost_usd": 10.0,
-            "fail_cost_usd": 25.0,
-            "warn_retry_loops": 3.0,
-            "fail_retry_loops": 6.0,
-        }
-    return {
-        "warn_uncached_tokens": 120000.0,
-        "fail_uncached_tokens": 300000.0,
-        "warn_cost_usd": 20.0,
-        "fail_cost_usd": 50.0,
-        "warn_retry_loops": 4.0,
-        "fail_retry_loops": 8.0,
-    }
+    return RUN_TYPE_THRESHOLDS.get(run_type, RUN_TYPE_THRESHOLDS["real"])
 
 
 def evaluate_run(summary: Dict[str, Any], run_type: str) -> Dict[str, Any]:
@@ -770,7 +971,7 @@ def evaluate_run(summary: Dict[str, Any], run_type: str) -> Dict[str, Any]:
         "run_type": run_type,
         "verdict": verdict,
         "checks": checks,
-        "thresholds": thresholds,
+        "thresholds": dict(thresholds),  # copy: the lookup table is shared module state
     }
 
 
@@ -791,6 +992,21 @@ def to_float(v: Any, default: float = 0.0) -> float:
         return default
 
 
+def pct_delta(current: float, base: float) -> float:
+    if base == 0:
+        return 0.0
+    return ((current - base) / base) * 100.0
+
+
+def _delta_block(current: float, baseline_median: float, digits: int) -> Dict[str, float]:
+    return {
+        "current": round(current, digits),
+        "baseline_median": round(baseline_median, digits),
+        "delta": round(current - baseline_median, digits),
+        "delta_percent": round(pct_delta(current, baseline_median), 2),
+    }
+
+
 def baseline_delta(
     trend_rows: List[Dict[str, str]],
     project_slug: str,
@@ -818,106 +1034,152 @@ def baseline_delta(
     cost_median = statistics.median(baseline_cost) if baseline_cost else 0.0
     eff_median = statistics.median(baseline_eff) if baseline_eff else 0.0
 
-    def pct_delta(current: float, base: float) -> float:
-        if base == 0:
-            return 0.0
-        return ((current - base) / base) * 100.0
-
     return {
         "sample_size": len(last),
-        "uncached_tokens": {
-            "current": round(uncached, 2),
-            "baseline_median": round(uncached_median, 2),
-            "delta": round(uncached - uncached_median, 2),
-            "delta_percent": round(pct_delta(uncached, uncached_median), 2),
-        },
-        "estimated_cost_usd": {
-            "current": round(cost, 6),
-            "baseline_median": round(cost_median, 6),
-            "delta": round(cost - cost_median, 6),
-            "delta_percent": round(pct_delta(cost, cost_median), 2),
-        },
-        "efficiency": {
-            "current": round(eff, 2),
-            "baseline_median": round(eff_median, 2),
-            "delta": round(eff - eff_median, 2),
-            "delta_percent": round(pct_delta(eff, eff_median), 2),
-        },
+        "uncached_tokens": _delta_block(uncached, uncached_median, 2),
+        "estimated_cost_usd": _delta_block(cost, cost_median, 6),
+        "efficiency": _delta_block(eff, eff_median, 2),
     }
 
 
+# Markdown report sections, compiled once at import. Each rendered block is a
+# single element of the line list that write_markdown joins with newlines.
+MD_HEADER_TEMPLATE = string.Template("""# Session Review Report
+
+- Report ID: `$report_id`
+- Session Ref ID: `$session_reference_id`
+- Generated: `$generated_at`
+- Source: `$source`
+- Run Type: `$run_type`
+- Model Used: `$model_used`
+- Sessions analyzed: `$sessions_analyzed`
+
+## Summary
+
+- Input tokens: $input_tokens
+- Output tokens: $output_tokens
+- Uncached tokens: $uncached_tokens
+- Cache creation tokens: $cache_creation_tokens
+- Cache read tokens: $cache_read_tokens
+- Total tokens: $total_tokens
+- Messages: $messages
+- Avg tokens/message: $avg_tokens_per_message
+- Tool calls: $tool_calls
+- Retry loops: $retry_loops
+- Repeated context ratio: $repeated_context_ratio$cost_line""")
+
+MD_SCORES_TEMPLATE = string.Template("""
+## Scores
+
+- Efficiency: $efficiency
+- Reliability: $reliability
+- Quality estimate: $quality_estimate
+- Composite: $composite
+- Confidence: $confidence
+- Method: $score_method
+
+## Top Token Drivers
+""")
+
+MD_EVALUATION_TEMPLATE = string.Template("""
+## Evaluation
+
+- Verdict: **$verdict**
+- Run type: $run_type""")
+
+MD_BASELINE_TEMPLATE = string.Template("""
+## Baseline Delta (Last 5 Similar Runs)
+
+- Sample size: $sample_size
+- Uncached tokens: $uncached
+- Estimated cost (USD): $cost
+- Efficiency: $efficiency""")
+
+MD_DELTA_TEMPLATE = string.Template("$current vs $baseline_median (delta $delta, $delta_percent%)")
+
+MD_DRIVER_TEMPLATE = string.Template("""$rank. $driver (impact: $estimated_token_impact)
+   - $details""")
+
+MD_RECOMMENDATION_TEMPLATE = string.Template("- $id [$expected_impact]: $action")
+
+MD_CHECK_TEMPLATE = string.Template("- $metric: $value$suffix (warn>$warn_limit, fail>$fail_limit) => $status")
+
+
+def _delta_fields(block: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: block.get(key) for key in ("current", "baseline_median", "delta", "delta_percent")}
+
+
+def encode_report_json(report: Dict[str, Any]) -> bytes:
+    """Encode a report as 2-space indented JSON with a trailing newline."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass
+    return (json.dumps(report, indent=2) + "\n").encode("utf-8")
+
+
+def dump_json_indented(obj: Any, out: TextIO) -> None:
+    if orjson is not None:
+        try:
+            out.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8"))
+            return
+        except TypeError:
+            # orjson rejects some payloads json accepts (e.g. >64-bit ints).
+            pass
+    json.dump(obj, out, indent=2)
+
+
 def to_markdown(report: Dict[str, Any]) -> str:
+    buf = io.StringIO()
+    write_markdown(report, buf)
+    return buf.getvalue()
+
+
+def write_markdown(report: Dict[str, Any], out: TextIO) -> None:
     s = report["summary"]
     scores = report["scores"]
     lines = [
-        "# Session Review Report",
-        "",
-        f"- Report ID: `{report['report_id']}`",
-        f"- Session Ref ID: `{report['session_reference_id']}`",
-        f"- Generated: `{report['generated_at']}`",
-        f"- Source: `{report['source']}`",
-        f"- Run Type: `{report.get('run_type', 'real')}`",
-        f"- Model Used: `{report['model_used']}`",
-        f"- Sessions analyzed: `{report['sessions_analyzed']}`",
-        "",
-        "## Summary",
-        "",
-        f"- Input tokens: {s['input_tokens']}",
-        f"- Output tokens: {s['output_tokens']}",
-        f"- Uncached tokens: {s.get('uncached_tokens', s['total_tokens'])}",
-        f"- Cache creation tokens: {s.get('cache_creation_tokens', 0)}",
-        f"- Cache read tokens: {s.get('cache_read_tokens', 0)}",
-        f"- Total tokens: {s['total_tokens']}",
-        f"- Messages: {s['messages']}",
-        f"- Avg tokens/message: {s['avg_tokens_per_message']}",
-        f"- Tool calls: {s['tool_calls']}",
-        f"- Retry loops: {s['retry_loops']}",
-        f"- Repeated context ratio: {s['repeated_context_ratio']}",
+        MD_HEADER_TEMPLATE.substitute(
+            s,
+            report_id=report["report_id"],
+            session_reference_id=report["session_reference_id"],
+            generated_at=report["generated_at"],
+            source=report["source"],
+            run_type=report.get("run_type", "real"),
+            model_used=report["model_used"],
+            sessions_analyzed=report["sessions_analyzed"],
+            uncached_tokens=s.get("uncached_tokens", s["total_tokens"]),
+            cache_creation_tokens=s.get("cache_creation_tokens", 0),
+            cache_read_tokens=s.get("cache_read_tokens", 0),
+            cost_line=f"\n- Estimated cost (USD): {s['estimated_cost_usd']}" if "estimated_cost_usd" in s else "",
+        )
     ]
-    if "estimated_cost_usd" in s:
-        lines.append(f"- Estimated cost (USD): {s['estimated_cost_usd']}")
-
-    if "budget" in report:
-        b = report["budget"]
-        constraints = b.get("constraints", {})
-        usage = b.get("usage", {})
-        adh = b.get("adherence", {})
-        lines.extend(["", "## Budget", ""])
-        for key, value in constraints.items():
-            lines.append(f"- Constraint {key}: {value}")
-        for key, value in usage.items():
-            lines.append(f"- Usage {key}: {value}")
-        for key, value in adh.items():
-            if key == "warnings":
-                continue
-            lines.append(f"- Adherence {key}: {value}")
-        if adh.get("warnings"):
-            lines.append("- Warnings:")
-            for w in adh["warnings"]:
-                lines.append(f"  - {w}")
-
-    lines.extend([
-        "",
-        "## Scores",
-        "",
-        f"- Efficiency: {scores['efficiency']}",
-        f"- Reliability: {scores['reliability']}",
-        f"- Quality estimate: {scores.get('quality_estimate', 'n/a')}",
-        f"- Composite: {scores['composite']}",
-        f"- Confidence: {scores.get('confidence', 'low')}",
-        f"- Method: {scores['score_method']}",
-        "",
-        "## Top Token Drivers",
-        "",
-    ])
-
-    for d in report["top_token_drivers"]:
-        lines.append(f"{d['rank']}. {d['driver']} (impact: {d['estimated_token_impact']})")
-        lines.append(f"   - {d['details']}")
+
+    budget = report.get("budget")
+    if budget is not None:
+        adh = budget.get("adherence", {})
+        warnings = adh.get("warnings")
+        section = ["", "## Budget", ""]
+        section.extend(f"- Constraint {key}: {value}" for key, value in budget.get("constraints", {}).items())
+        section.extend(f"- Usage {key}: {value}" for key, value in budget.get("usage", {}).items())
+        section.extend(f"- Adherence {key}: {value}" for key, value in adh.items() if key != "warnings")
+        if warnings:
+            section.append("- Warnings:")
+            section.extend(f"  - {w}" for w in warnings)
+        lines.append("\n".join(section))
+
+    lines.append(MD_SCORES_TEMPLATE.substitute(
+        scores,
+        quality_estimate=scores.get("quality_estimate", "n/a"),
+        confidence=scores.get("confidence", "low"),
+    ))
+
+    lines.extend(MD_DRIVER_TEMPLATE.substitute(d) for d in report["top_token_drivers"])
 
     lines.extend(["", "## Recommendations", ""])
     for r in report["recommendations"]:
-        lines.append(f"- {r['id']} [{r['expected_impact']}]: {r['action']}")
+        lines.append(MD_RECOMMENDATION_TEMPLATE.substitute(r))
         if r.get("rationale"):
             lines.append(f"  rationale: {r['rationale']}")
         if r.get("doc_refs"):
@@ -925,151 +1187,218 @@ def to_markdown(report: Dict[str, Any]) -> str:
 
     evaluation = report.get("evaluation")
     if evaluation:
-        lines.extend(["", "## Evaluation", ""])
-        lines.append(f"- Verdict: **{evaluation.get('verdict', 'unknown')}**")
-        lines.append(f"- Run type: {evaluation.get('run_type', 'real')}")
+        lines.append(MD_EVALUATION_TEMPLATE.substitute(
+            verdict=evaluation.get("verdict", "unknown"),
+            run_type=evaluation.get("run_type", "real"),
+        ))
         for check in evaluation.get("checks", []):
             unit = check.get("unit", "")
-            suffix = f" {unit}" if unit else ""
-            lines.append(
-                f"- {check.get('metric')}: {check.get('value')}{suffix} (warn>{check.get('warn_limit')}, fail>{check.get('fail_limit')}) => {check.get('status')}"
-            )
+            lines.append(MD_CHECK_TEMPLATE.substitute(
+                metric=check.get("metric"),
+                value=check.get("value"),
+                suffix=f" {unit}" if unit else "",
+                warn_limit=check.get("warn_limit"),
+                fail_limit=check.get("fail_limit"),
+                status=check.get("status"),
+            ))
 
     baseline = report.get("baseline_delta")
     if baseline:
-        lines.extend(["", "## Baseline Delta (Last 5 Similar Runs)", ""])
-        lines.append(f"- Sample size: {baseline.get('sample_size', 0)}")
         uncached = baseline.get("uncached_tokens", {})
         cost = baseline.get("estimated_cost_usd", {})
         eff = baseline.get("efficiency", {})
-        lines.append(
-            f"- Uncached tokens: {uncached.get('current')} vs {uncached.get('baseline_median')} (delta {uncached.get('delta')}, {uncached.get('delta_percent')}%)"
-        )
-        lines.append(
-            f"- Estimated cost (USD): {cost.get('current')} vs {cost.get('baseline_median')} (delta {cost.get('delta')}, {cost.get('delta_percent')}%)"
-        )
-        lines.append(
-            f"- Efficiency: {eff.get('current')} vs {eff.get('baseline_median')} (delta {eff.get('delta')}, {eff.get('delta_percent')}%)"
-        )
+        lines.append(MD_BASELINE_TEMPLATE.substitute(
+            sample_size=baseline.get("sample_size", 0),
+            uncached=MD_DELTA_TEMPLATE.substitute(_delta_fields(uncached)),
+            cost=MD_DELTA_TEMPLATE.substitute(_delta_fields(cost)),
+            efficiency=MD_DELTA_TEMPLATE.substitute(_delta_fields(eff)),
+        ))
+
+    out.write("\n".join(lines))
 
+    # Raw tool payloads can be large; serialize them straight into the sink
+    # instead of materializing an indented copy inside the report string.
     raw_sources = report.get("raw_sources", {})
     if raw_sources:
-        lines.extend(["", "## Appendix: Raw Tool Output", ""])
-        agtrace_raw = raw_sources.get("agtrace")
-        if agtrace_raw is not None:
-            lines.append("### agtrace")
-            lines.append("")
-            lines.append("```json")
-            lines.append(json.dumps(agtrace_raw, indent=2))
-            lines.append("```")
-            lines.append("")
-
-        ccusage_raw = raw_sources.get("ccusage")
-        if ccusage_raw is not None:
-            lines.append("### ccusage")
-            lines.append("")
-            lines.append("```json")
-            lines.append(json.dumps(ccusage_raw, indent=2))
-            lines.append("```")
-            lines.append("")
-    lines.append("")
-    return "\n".join(lines)
-
-
-def append_trend_row(trend_path: Path, report: Dict[str, Any], report_path: str, project_slug: str) -> None:
-    header = [
-        "date",
-        "project",
-        "source",
-        "run_type",
-        "session_reference_id",
-        "session_id",
-        "uncached_tokens",
-        "total_tokens",
-        "input_tokens",
-        "output_tokens",
-        "tool_calls",
-        "retry_loops",
-        "efficiency",
-        "reliability",
-        "composite",
-        "estimated_cost_usd",
-        "verdict",
-        "report_path",
-    ]
+        out.write("\n\n## Appendix: Raw Tool Output\n")
+        for name in ("agtrace", "ccusage"):
+            raw = raw_sources.get(name)
+            if raw is not None:
+                out.write(f"\n### {name}\n\n```json\n")
+                raw_text = getattr(raw, "raw_text", "")
+                if raw_text:
+                    # Unmodified tool output: embed it as-is.
+                    out.write(raw_text)
+                else:
+                    dump_json_indented(raw, out)
+                out.write("\n```\n")
+    out.write("\n")
+
+
+def schema_compatible(current: Tuple[str, ...], expected: Tuple[str, ...]) -> bool:
+    """True when the on-disk header is the expected columns, in order, plus
+    optional trailing extras.
+
+    Reordered headers are not compatible: session-review-checkpoint.sh appends
+    rows in canonical column order without reading the header, so a permuted
+    file must be migrated back to canonical order.
+    """
+    return current[:len(expected)] == expected
+
+
+def prepare_trend_file(trend_path: Path, force_migrate: bool = False) -> Tuple[str, ...]:
     trend_path.parent.mkdir(parents=True, exist_ok=True)
 
-    existing_rows = read_trend_rows(trend_path)
-    if not trend_path.exists() or not existing_rows:
+    # Only the header line is needed to detect schema drift; the full file is
+    # read back solely when a migration rewrite is required.
+    try:
+        has_content = trend_path.stat().st_size > 0
+    except FileNotFoundError:
+        has_content = False
+
+    current_fields: Tuple[str, ...] = ()
+    if has_content:
+        with trend_path.open("r", encoding="utf-8", newline="") as f:
+            current_fields = tuple(next(csv.reader(f), ()))
+
+    if not current_fields:
         with trend_path.open("w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=header)
+            writer = csv.DictWriter(f, fieldnames=TREND_HEADER)
             writer.writeheader()
-    else:
-        with trend_path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            current_fields = reader.fieldnames or []
-        if current_fields != header:
-            migrated: List[Dict[str, str]] = []
-            for row in existing_rows:
-                migrated.append({
-                    "date": row.get("date", ""),
-                    "project": row.get("project", ""),
-                    "source": row.get("source", ""),
-                    "run_type": row.get("run_type", "real"),
-                    "session_reference_id": row.get("session_reference_id", ""),
-                    "session_id": row.get("session_id", ""),
-                    "uncached_tokens": row.get("uncached_tokens", row.get("total_tokens", "0")),
-                    "total_tokens": row.get("total_tokens", "0"),
-                    "input_tokens": row.get("input_tokens", "0"),
-                    "output_tokens": row.get("output_tokens", "0"),
-                    "tool_calls": row.get("tool_calls", "0"),
-                    "retry_loops": row.get("retry_loops", "0"),
-                    "efficiency": row.get("efficiency", "0"),
-                    "reliability": row.get("reliability", "0"),
-                    "composite": row.get("composite", "0"),
-                    "estimated_cost_usd": row.get("estimated_cost_usd", "0"),
-                    "verdict": row.get("verdict", ""),
-                    "report_path": row.get("report_path", ""),
-                })
-            with trend_path.open("w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=header)
-                writer.writeheader()
-                writer.writerows(migrated)
-
-    session_id = (
-        report.get("raw_sources", {})
-        .get("agtrace", {})
-        .get("content", {})
-        .get("header", {})
-        .get("session_id", "")
+        return TREND_HEADER
+    if current_fields == TREND_HEADER:
+        return TREND_HEADER
+    if not force_migrate and schema_compatible(current_fields, TREND_HEADER):
+        return current_fields
+
+    existing_rows = read_trend_rows(trend_path)
+    migrated: List[Dict[str, str]] = []
+    for row in existing_rows:
+        migrated.append({
+            "date": row.get("date", ""),
+            "project": row.get("project", ""),
+            "source": row.get("source", ""),
+            "run_type": row.get("run_type", "real"),
+            "session_reference_id": row.get("session_reference_id", ""),
+            "session_id": row.get("session_id", ""),
+            "uncached_tokens": row.get("uncached_tokens", row.get("total_tokens", "0")),
+            "total_tokens": row.get("total_tokens", "0"),
+            "input_tokens": row.get("input_tokens", "0"),
+            "output_tokens": row.get("output_tokens", "0"),
+            "tool_calls": row.get("tool_calls", "0"),
+            "retry_loops": row.get("retry_loops", "0"),
+            "efficiency": row.get("efficiency", "0"),
+            "reliability": row.get("reliability", "0"),
+            "composite": row.get("composite", "0"),
+            "estimated_cost_usd": row.get("estimated_cost_usd", "0"),
+            "verdict": row.get("verdict", ""),
+            "report_path": row.get("report_path", ""),
+        })
+    with trend_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TREND_HEADER)
+        writer.writeheader()
+        writer.writerows(migrated)
+    return TREND_HEADER
+
+
+def build_trend_row(report: Dict[str, Any], report_path: str, project_slug: str, date: str) -> Tuple[str, ...]:
+    """Return the trend row values in TREND_HEADER order."""
+    summary = report.get("summary") or {}
+    scores = report.get("scores") or {}
+    evaluation = report.get("evaluation") or {}
+    session_id = report.get("session_id") or ""
+    return (
+        date,
+        project_slug,
+        report.get("source", ""),
+        report.get("run_type", "real"),
+        report.get("session_reference_id", ""),
+        session_id,
+        str(summary.get("uncached_tokens", 0)),
+        str(summary.get("total_tokens", 0)),
+        str(summary.get("input_tokens", 0)),
+        str(summary.get("output_tokens", 0)),
+        str(summary.get("tool_calls", 0)),
+        str(summary.get("retry_loops", 0)),
+        str(scores.get("efficiency", 0)),
+        str(scores.get("reliability", 0)),
+        str(scores.get("composite", 0)),
+        str(summary.get("estimated_cost_usd", 0)),
+        str(evaluation.get("verdict", "")),
+        report_path,
     )
-    row = {
-        "date": dt.datetime.now(dt.timezone.utc).date().isoformat(),
-        "project": project_slug,
-        "source": report.get("source", ""),
-        "run_type": report.get("run_type", "real"),
-        "session_reference_id": report.get("session_reference_id", ""),
-        "session_id": session_id,
-        "uncached_tokens": str(report.get("summary", {}).get("uncached_tokens", 0)),
-        "total_tokens": str(report.get("summary", {}).get("total_tokens", 0)),
-        "input_tokens": str(report.get("summary", {}).get("input_tokens", 0)),
-        "output_tokens": str(report.get("summary", {}).get("output_tokens", 0)),
-        "tool_calls": str(report.get("summary", {}).get("tool_calls", 0)),
-        "retry_loops": str(report.get("summary", {}).get("retry_loops", 0)),
-        "efficiency": str(report.get("scores", {}).get("efficiency", 0)),
-        "reliability": str(report.get("scores", {}).get("reliability", 0)),
-        "composite": str(report.get("scores", {}).get("composite", 0)),
-        "estimated_cost_usd": str(report.get("summary", {}).get("estimated_cost_usd", 0)),
-        "verdict": str(report.get("evaluation", {}).get("verdict", "")),
-        "report_path": report_path,
-    }
-    with trend_path.open("a", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=header)
-        writer.writerow(row)
+
+
+class AppendTrendBuffer:
+    """Accumulate trend rows and write them through one append handle.
+
+    The handle is opened (and the header checked) on the first flush, then
+    reused; each flush writes all pending rows and fsyncs once.
+    """
+
+    def __init__(self, trend_path: Path, force_migrate: bool = False) -> None:
+        self.trend_path = trend_path
+        self.force_migrate = force_migrate
+        self._rows: List[Tuple[str, ...]] = []
+        self._handle: TextIO | None = None
+        self._writer: Any = None
+        # Column positions into TREND_HEADER order when the on-disk header is
+        # a compatible reordering; None when rows can be written as-is.
+        self._positions: List[int | None] | None = None
+
+    def add(self, row: Tuple[str, ...]) -> None:
+        self._rows.append(row)
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        if self._handle is None:
+            fieldnames = prepare_trend_file(self.trend_path, self.force_migrate)
+            if fieldnames != TREND_HEADER:
+                self._positions = [TREND_HEADER.index(n) if n in TREND_HEADER else None for n in fieldnames]
+            self._handle = self.trend_path.open("a", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._handle)
+        if self._positions is None:
+            self._writer.writerows(self._rows)
+        else:
+            positions = self._positions
+            self._writer.writerows(["" if i is None else row[i] for i in positions] for row in self._rows)
+        self._rows.clear()
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+                self._writer = None
+
+    def __enter__(self) -> "AppendTrendBuffer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def append_trend_row(
+    trend_path: Path,
+    report: Dict[str, Any],
+    report_path: str,
+    project_slug: str,
+    date: str,
+    force_migrate: bool = False,
+) -> None:
+    with AppendTrendBuffer(trend_path, force_migrate) as buffer:
+        buffer.add(build_trend_row(report, report_path, project_slug, date))
 
 
 def main() -> int:
     args = parse_args()
+    now = dt.datetime.now(dt.timezone.utc)
+    run_uuid = uuid.uuid4().hex
     run_type = args.run_type
     project_raw = args.project or Path(args.path).name
     project_slug = normalize_slug(project_raw)
@@ -1079,7 +1408,7 @@ def main() -> int:
         if args.session_id:
             session_reference_id = f"sid-{args.session_id}"
         else:
-            session_reference_id = f"auto-{dt.datetime.now(dt.timezone.utc).strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+            session_reference_id = f"auto-{now.strftime('%Y%m%d-%H%M%S')}-{run_uuid[:6]}"
 
     try:
         source = detect_source(args)
@@ -1093,11 +1422,17 @@ def main() -> int:
             model_used = infer_model_used(source, agtrace_show, ccusage_data=None)
             source_reliability = 0.8
         elif source == "claude":
-            agtrace_show = agtrace_session(args, provider="claude_code", session_id=args.session_id)
+            if args.session_id:
+                # ccusage only needs the session id, so run it alongside agtrace.
+                with ThreadPoolExecutor(max_workers=1) as pool:
+                    ccusage_future = pool.submit(ccusage_session, args.session_id)
+                    agtrace_show = agtrace_session(args, provider="claude_code", session_id=args.session_id)
+                    ccusage_data = ccusage_future.result()
+            else:
+                agtrace_show = agtrace_session(args, provider="claude_code", session_id=None)
+                ccusage_data = ccusage_session(_dig(agtrace_show, "content", "header", "session_id"))
             raw_sources["agtrace"] = agtrace_show
             agtrace_summary = summarize_from_agtrace(agtrace_show)
-            claude_session_id = args.session_id or agtrace_show.get("content", {}).get("header", {}).get("session_id")
-            ccusage_data = ccusage_session(claude_session_id)
             if ccusage_data is not None:
                 raw_sources["ccusage"] = ccusage_data
             summary = merge_claude_summary(ccusage_data, agtrace_summary)
@@ -1107,9 +1442,8 @@ def main() -> int:
             raise ToolError(f"unsupported source: {source}")
 
     except ToolError as exc:
-        print(f"ERROR: {exc}", file=sys.stderr)
-        print("Install requirements:", file=sys.stderr)
-        print("  npm install -g @lanegrid/agtrace ccusage", file=sys.stderr)
+        sys.stderr.write(f"ERROR: {exc}\n{INSTALL_HINT}")
+        sys.stderr.flush()
         return 1
 
     budget = build_budget(summary, args)
@@ -1127,39 +1461,57 @@ def main() -> int:
         )
 
     report: Dict[str, Any] = {
-        "report_id": f"session-review-{uuid.uuid4().hex[:8]}",
+        "report_id": f"session-review-{run_uuid[:8]}",
         "session_reference_id": session_reference_id,
-        "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "generated_at": now.isoformat(),
         "project": project_slug,
         "run_type": run_type,
         "model_used": model_used,
         "source": source,
         "sessions_analyzed": 1,
+        "session_id": _dig(raw_sources, "agtrace", "content", "header", "session_id", default=""),
         "summary": summary,
         "scores": scores,
         "evaluation": evaluation,
         "top_token_drivers": build_drivers(summary),
         "recommendations": build_recommendations(summary, budget),
-        "raw_sources": raw_sources,
     }
+    # Raw payloads can dwarf the rest of the report; embed them only on request.
+    if args.include_raw_sources:
+        report["raw_sources"] = raw_sources
     if budget is not None:
         report["budget"] = budget
     if baseline is not None:
         report["baseline_delta"] = baseline
 
-    output = json.dumps(report, indent=2) if args.format == "json" else to_markdown(report)
-
     out_path: Path | None = None
     if args.out:
         out_path = Path(args.out)
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(output + ("" if output.endswith("\n") else "\n"), encoding="utf-8")
+        if args.format == "json":
+            out_path.write_bytes(encode_report_json(report))
+        else:
+            with out_path.open("w", encoding="utf-8", buffering=OUTPUT_BUFFER_SIZE) as f:
+                write_markdown(report, f)
+    elif args.format == "json":
+        # Write the encoded bytes as-is; decoding would fail on non-UTF-8 stdouts.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(encode_report_json(report))
     else:
-        print(output)
+        # Stream straight to stdout so the report never exists as one string.
+        write_markdown(report, sys.stdout)
+        sys.stdout.write("\n")
 
     if trend_path is not None:
         report_path_for_trend = str(out_path) if out_path is not None else ""
-        append_trend_row(trend_path, report, report_path_for_trend, project_slug)
+        append_trend_row(
+            trend_path,
+            report,
+            report_path_for_trend,
+            project_slug,
+            now.date().isoformat(),
+            args.force_migrate,
+        )
     return 0
 
 
@@ -183,7 +183,7 @@ report_session_ref_id="$(jq -r '.session_reference_id // empty' "$report_out")"
 if [[ -z "$report_session_ref_id" || "$report_session_ref_id" == "null" ]]; then
   report_session_ref_id="$session_ref_id"
 fi
-resolved_session_id="$(jq -r '.raw_sources.agtrace.content.header.session_id // empty' "$report_out")"
+resolved_session_id="$(jq -r '(.session_id | select(. != "")) // .raw_sources.agtrace.content.header.session_id // empty' "$report_out")"
 if [[ -z "$resolved_session_id" || "$resolved_session_id" == "null" ]]; then
   resolved_session_id="$session_ref_id"
 fi
@@ -6,14 +6,18 @@ from __future__ import annotations
 import argparse
 import csv
 import curses
+import os
 import time
-from dataclasses import dataclass
+from collections import defaultdict
+from operator import attrgetter, itemgetter
 from pathlib import Path
-from typing import Dict, List
+from typing import DefaultDict, Dict, Iterator, List, NamedTuple, Tuple
 
+# Trend histories can grow large; read them in 1 MiB chunks.
+TREND_READ_BUFFER = 1 << 20
 
-@dataclass
-class TrendRow:
+
+class TrendRow(NamedTuple):
     date: str
     project: str
     source: str
@@ -24,6 +28,18 @@ class TrendRow:
     retry_loops: int
 
 
+class TrendSummary(NamedTuple):
+    project_totals: List[Tuple[str, int]]
+    total_tokens: int
+    avg_composite: float
+    avg_efficiency: float
+
+
+# Parsed rows per trend file, keyed by the (mtime_ns, size) they were read at,
+# so periodic refreshes only re-parse files that changed.
+_TREND_CACHE: Dict[Path, Tuple[Tuple[int, int], List[TrendRow]]] = {}
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Launch a TUI for session-review trend data."
@@ -43,67 +59,169 @@ def parse_args() -> argparse.Namespace:
 
 
 def to_int(value: str, default: int = 0) -> int:
+    # Blank cells are common, and most others are plain digits; only signed,
+    # decimal or exponent forms ("-5", "1.0", "1e3") go through float().
+    if not value:
+        return default
     try:
+        if value.isdigit():
+            return int(value)
         return int(float(value))
-    except (TypeError, ValueError):
+    except (TypeError, ValueError, OverflowError):
         return default
 
 
 def to_float(value: str, default: float = 0.0) -> float:
+    # Blank cells are common; skip the exception path for them.
+    if not value:
+        return default
     try:
         return float(value)
     except (TypeError, ValueError):
         return default
 
 
+def _iter_trend_files(root: Path) -> Iterator[Path]:
+    """Yield <root>/<project>/trend.csv for each project directory, in name order."""
+    try:
+        with os.scandir(root) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_dir())
+    except OSError:
+        return
+    for name in names:
+        trend_file = root / name / "trend.csv"
+        if trend_file.is_file():
+            yield trend_file
+
+
+def _read_trend_file(trend_file: Path) -> List[TrendRow]:
+    rows: List[TrendRow] = []
+    project = trend_file.parent.name
+    with trend_file.open(
+        "r", encoding="utf-8", newline="", buffering=TREND_READ_BUFFER
+    ) as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            return rows
+        width = len(header)
+        columns = {name: index for index, name in enumerate(header)}
+        # Columns absent from this file's header read the trailing blank cell.
+        (
+            i_date,
+            i_source,
+            i_session_reference_id,
+            i_session_id,
+            i_total_tokens,
+            i_composite,
+            i_efficiency,
+            i_retry_loops,
+        ) = (
+            columns.get(name, width)
+            for name in (
+                "date",
+                "source",
+                "session_reference_id",
+                "session_id",
+                "total_tokens",
+                "composite",
+                "efficiency",
+                "retry_loops",
+            )
+        )
+        blanks = [""] * width
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                # Like DictReader: pad short rows and ignore extra fields.
+                row = (row + blanks)[:width]
+            row.append("")
+            rows.append(
+                TrendRow(
+                    date=row[i_date].strip(),
+                    project=project,
+                    source=row[i_source].strip(),
+                    session_reference_id=row[i_session_reference_id].strip()
+                    or row[i_session_id].strip(),
+                    total_tokens=to_int(row[i_total_tokens]),
+                    composite=to_float(row[i_composite]),
+                    efficiency=to_float(row[i_efficiency]),
+                    retry_loops=to_int(row[i_retry_loops]),
+                )
+            )
+    return rows
+
+
 def load_rows(root: Path) -> List[TrendRow]:
     rows: List[TrendRow] = []
-    for trend_file in sorted(root.glob("*/trend.csv")):
-        project = trend_file.parent.name
+    fresh: Dict[Path, Tuple[Tuple[int, int], List[TrendRow]]] = {}
+    for trend_file in _iter_trend_files(root):
         try:
-            with trend_file.open("r", encoding="utf-8", newline="") as handle:
-                for row in csv.DictReader(handle):
-                    rows.append(
-                        TrendRow(
-                            date=str(row.get("date", "")).strip(),
-                            project=project,
-                            source=str(row.get("source", "")).strip(),
-                            session_reference_id=str(
-                                row.get("session_reference_id", "")
-                            ).strip()
-                            or str(row.get("session_id", "")).strip(),
-                            total_tokens=to_int(str(row.get("total_tokens", "0"))),
-                            composite=to_float(str(row.get("composite", "0"))),
-                            efficiency=to_float(str(row.get("efficiency", "0"))),
-                            retry_loops=to_int(str(row.get("retry_loops", "0"))),
-                        )
-                    )
+            st = trend_file.stat()
+            signature = (st.st_mtime_ns, st.st_size)
+            cached = _TREND_CACHE.get(trend_file)
+            if cached is not None and cached[0] == signature:
+                file_rows = cached[1]
+            else:
+                file_rows = _read_trend_file(trend_file)
         except OSError:
             continue
-    rows.sort(key=lambda r: (r.date, r.session_reference_id), reverse=True)
+        fresh[trend_file] = (signature, file_rows)
+        rows.extend(file_rows)
+    # Replace rather than update so deleted trend files drop out of the cache.
+    _TREND_CACHE.clear()
+    _TREND_CACHE.update(fresh)
+    rows.sort(key=attrgetter("date", "session_reference_id"), reverse=True)
     return rows
 
 
-def aggregate_tokens_by_project(rows: List[TrendRow]) -> List[tuple[str, int]]:
-    totals: Dict[str, int] = {}
+def summarize(rows: List[TrendRow]) -> TrendSummary:
+    """Aggregate rows; project totals sort by tokens, descending."""
+    # Only the per-project grouping needs a Python-level loop; the remaining
+    # reductions run in C via sum() over attribute getters.
+    totals: DefaultDict[str, int] = defaultdict(int)
     for row in rows:
-        totals[row.project] = totals.get(row.project, 0) + row.total_tokens
-    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        totals[row.project] += row.total_tokens
+    total_tokens = sum(totals.values())
+    count = len(rows)
+    avg_composite = sum(map(attrgetter("composite"), rows)) / count if count else 0.0
+    avg_efficiency = sum(map(attrgetter("efficiency"), rows)) / count if count else 0.0
+    project_totals = sorted(totals.items(), key=itemgetter(1), reverse=True)
+    return TrendSummary(project_totals, total_tokens, avg_composite, avg_efficiency)
+
+
+def refresh_info_text(last_refresh_at: float) -> str:
+    age = int(max(0, time.time() - last_refresh_at))
+    return f"last refresh: {age}s ago"
+
+
+def update_refresh_info(stdscr: "curses._CursesWindow", last_refresh_at: float) -> None:
+    """Redraw only the "last refresh" line of an otherwise unchanged frame."""
+    width = stdscr.getmaxyx()[1]
+    stdscr.move(3, 0)
+    stdscr.clrtoeol()
+    stdscr.addnstr(3, 0, refresh_info_text(last_refresh_at), width - 1)
+    stdscr.refresh()
 
 
 def draw_dashboard(
     stdscr: "curses._CursesWindow",
     rows: List[TrendRow],
+    stats: TrendSummary,
     root: Path,
     refresh_seconds: int,
     last_refresh_at: float,
 ) -> None:
     stdscr.erase()
     height, width = stdscr.getmaxyx()
+    # Bound once per frame; the body below issues many addnstr calls.
+    addnstr = stdscr.addnstr
+    bold = curses.A_BOLD
+    underline = curses.A_UNDERLINE
+    max_width = width - 1
 
-    total_tokens = sum(r.total_tokens for r in rows)
-    avg_composite = sum(r.composite for r in rows) / len(rows) if rows else 0.0
-    avg_efficiency = sum(r.efficiency for r in rows) / len(rows) if rows else 0.0
+    project_totals, total_tokens, avg_composite, avg_efficiency = stats
 
     header = "Session Review Dashboard (TUI)"
     subtitle = (
@@ -114,29 +232,27 @@ def draw_dashboard(
         f"sessions={len(rows)}  total_tokens={total_tokens:,}  "
         f"avg_composite={avg_composite:.1f}  avg_efficiency={avg_efficiency:.1f}"
     )
-    age = int(max(0, time.time() - last_refresh_at))
-    refresh_info = f"last refresh: {age}s ago"
+    refresh_info = refresh_info_text(last_refresh_at)
 
-    stdscr.addnstr(0, 0, header, width - 1, curses.A_BOLD)
-    stdscr.addnstr(1, 0, subtitle, width - 1)
-    stdscr.addnstr(2, 0, summary, width - 1)
-    stdscr.addnstr(3, 0, refresh_info, width - 1)
+    addnstr(0, 0, header, max_width, bold)
+    addnstr(1, 0, subtitle, max_width)
+    addnstr(2, 0, summary, max_width)
+    addnstr(3, 0, refresh_info, max_width)
 
     y = 5
-    stdscr.addnstr(y, 0, "Top Projects by Token Load", width - 1, curses.A_UNDERLINE)
+    addnstr(y, 0, "Top Projects by Token Load", max_width, underline)
     y += 1
-    project_totals = aggregate_tokens_by_project(rows)[:6]
-    for project, tokens in project_totals:
-        stdscr.addnstr(y, 0, f"- {project:<20} {tokens:>12,}", width - 1)
+    for project, tokens in project_totals[:6]:
+        addnstr(y, 0, f"- {project:<20} {tokens:>12,}", max_width)
         y += 1
 
     y += 1
-    stdscr.addnstr(
+    addnstr(
         y,
         0,
         "Recent Sessions (date project source tokens composite retry ref)",
-        width - 1,
-        curses.A_UNDERLINE,
+        max_width,
+        underline,
     )
     y += 1
 
@@ -147,7 +263,7 @@ def draw_dashboard(
             f"{row.total_tokens:>10,} {row.composite:>7.1f} "
             f"{row.retry_loops:>5} {row.session_reference_id}"
         )
-        stdscr.addnstr(y, 0, line, width - 1)
+        addnstr(y, 0, line, max_width)
         y += 1
 
     stdscr.refresh()
@@ -158,22 +274,36 @@ def run(stdscr: "curses._CursesWindow", root: Path, refresh_seconds: int) -> Non
     stdscr.nodelay(True)
     stdscr.timeout(250)
 
+    # Aggregates only change when rows are reloaded, not on every redraw.
     rows = load_rows(root)
+    stats = summarize(rows)
     last_refresh_at = time.time()
 
+    # Full redraws only happen when the rows or terminal size change; other
+    # ticks just update the age line.
+    drawn_rows: List[TrendRow] | None = None
+    drawn_size: Tuple[int, int] | None = None
+
     while True:
-        draw_dashboard(stdscr, rows, root, refresh_seconds, last_refresh_at)
+        size = stdscr.getmaxyx()
+        if rows is drawn_rows and size == drawn_size:
+            update_refresh_info(stdscr, last_refresh_at)
+        else:
+            draw_dashboard(stdscr, rows, stats, root, refresh_seconds, last_refresh_at)
+            drawn_rows, drawn_size = rows, size
         key = stdscr.getch()
 
         if key in (ord("q"), ord("Q")):
             break
         if key in (ord("r"), ord("R")):
             rows = load_rows(root)
+            stats = summarize(rows)
             last_refresh_at = time.time()
             continue
 
         if time.time() - last_refresh_at >= refresh_seconds:
             rows = load_rows(root)
+            stats = summarize(rows)
             last_refresh_at = time.time()
 
 
@@ -5,10 +5,22 @@ from __future__ import annotations
 
 import argparse
 import csv
+import functools
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+# Trend histories can grow large; read them in 1 MiB chunks.
+TREND_READ_BUFFER = 1 << 20
 
 
 def parse_args() -> argparse.Namespace:
@@ -27,147 +39,212 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def to_float(value: Any, default: float = 0.0) -> float:
+def to_float(value: str, default: float = 0.0) -> float:
+    # Blank cells are common; skip the exception path for them.
+    if not value:
+        return default
     try:
         return float(value)
     except (TypeError, ValueError):
         return default
 
 
-def to_int(value: Any, default: int = 0) -> int:
+def to_int(value: str, default: int = 0) -> int:
+    # Blank cells are common, and most others are plain digits; only signed,
+    # decimal or exponent forms ("-5", "1.0", "1e3") go through float().
+    if not value:
+        return default
     try:
+        if value.isdigit():
+            return int(value)
         return int(float(value))
-    except (TypeError, ValueError):
+    except (TypeError, ValueError, OverflowError):
         return default
 
 
+def loads_json(data: bytes) -> Any:
+    """json.loads via orjson when installed; stdlib decides anything orjson rejects."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
 def read_json_report(report_path: Path) -> Dict[str, Any]:
     try:
-        raw = json.loads(report_path.read_text(encoding="utf-8"))
-    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        # Parse the raw bytes; both decoders handle UTF-8 themselves.
+        raw = loads_json(report_path.read_bytes())
+    except (OSError, ValueError):
         return {}
 
-    recommendations: List[Dict[str, str]] = []
-    for rec in raw.get("recommendations", [])[:3]:
-        if isinstance(rec, dict):
-            recommendations.append(
-                {
-                    "id": str(rec.get("id", "")),
-                    "action": str(rec.get("action", "")),
-                    "expected_impact": str(rec.get("expected_impact", "")),
-                }
-            )
-
-    top_drivers: List[Dict[str, Any]] = []
-    for driver in raw.get("top_token_drivers", [])[:3]:
-        if isinstance(driver, dict):
-            top_drivers.append(
-                {
-                    "rank": to_int(driver.get("rank"), 0),
-                    "driver": str(driver.get("driver", "")),
-                    "estimated_token_impact": to_int(
-                        driver.get("estimated_token_impact"), 0
-                    ),
-                }
-            )
-
-    return {
-        "report_id": str(raw.get("report_id", "")),
-        "generated_at": str(raw.get("generated_at", "")),
-        "model_used": str(raw.get("model_used", "")),
+    # The dashboard only shows each report's source and top recommendation.
+    meta = {
         "source": str(raw.get("source", "")),
-        "scores": {
-            "efficiency": to_float(raw.get("scores", {}).get("efficiency"), 0.0),
-            "reliability": to_float(raw.get("scores", {}).get("reliability"), 0.0),
-            "composite": to_float(raw.get("scores", {}).get("composite"), 0.0),
-        },
-        "summary": {
-            "total_tokens": to_int(raw.get("summary", {}).get("total_tokens"), 0),
-            "tool_calls": to_int(raw.get("summary", {}).get("tool_calls"), 0),
-            "retry_loops": to_int(raw.get("summary", {}).get("retry_loops"), 0),
-            "messages": to_int(raw.get("summary", {}).get("messages"), 0),
-        },
-        "recommendations": recommendations,
-        "top_token_drivers": top_drivers,
+        "top_rec_action": "",
+        "top_rec_impact": "",
     }
+    for rec in raw.get("recommendations", [])[:3]:
+        if isinstance(rec, dict):
+            meta["top_rec_action"] = str(rec.get("action", ""))
+            meta["top_rec_impact"] = str(rec.get("expected_impact", ""))
+            break
+    return meta
 
 
-def resolve_report_path(trend_file: Path, report_path_raw: str) -> Optional[Path]:
+def resolve_report_path(repo_root: Path, report_path_raw: str) -> Optional[Path]:
     if not report_path_raw:
         return None
     report_path = Path(report_path_raw)
     if report_path.is_absolute():
         return report_path
-    repo_root = trend_file.parents[2]
     return repo_root / report_path
 
 
-def load_rows(root: Path) -> List[Dict[str, Any]]:
+def _iter_trend_files(root: Path) -> Iterator[Path]:
+    """Yield <root>/<project>/trend.csv for each project directory, in name order."""
+    try:
+        with os.scandir(root) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_dir())
+    except OSError:
+        return
+    for name in names:
+        trend_file = root / name / "trend.csv"
+        if trend_file.is_file():
+            yield trend_file
+
+
+def _load_trend_file(
+    trend_file: Path, report_cache: Dict[Path, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
-    for trend_file in sorted(root.glob("*/trend.csv")):
-        project = trend_file.parent.name
-        try:
-            with trend_file.open("r", encoding="utf-8", newline="") as handle:
-                reader = csv.DictReader(handle)
-                for item in reader:
-                    report_path = resolve_report_path(
-                        trend_file, str(item.get("report_path", "")).strip()
-                    )
-                    report_meta = read_json_report(report_path) if report_path else {}
-
-                    session_id = str(item.get("session_id", "")).strip()
-                    session_reference_id = str(
-                        item.get("session_reference_id", "")
-                    ).strip()
-                    source = str(item.get("source", "")).strip() or report_meta.get(
-                        "source", "unknown"
-                    )
-                    date_value = str(item.get("date", "")).strip()
-                    report_name = report_path.name if report_path else ""
-
-                    rows.append(
-                        {
-                            "project": project,
-                            "date": date_value,
-                            "source": source,
-                            "session_id": session_id,
-                            "session_reference_id": session_reference_id,
-                            "total_tokens": to_int(item.get("total_tokens"), 0),
-                            "input_tokens": to_int(item.get("input_tokens"), 0),
-                            "output_tokens": to_int(item.get("output_tokens"), 0),
-                            "tool_calls": to_int(item.get("tool_calls"), 0),
-                            "retry_loops": to_int(item.get("retry_loops"), 0),
-                            "efficiency": to_float(item.get("efficiency"), 0.0),
-                            "reliability": to_float(item.get("reliability"), 0.0),
-                            "composite": to_float(item.get("composite"), 0.0),
-                            "estimated_cost_usd": to_float(
-                                item.get("estimated_cost_usd"), 0.0
-                            ),
-                            "report_path": str(report_path) if report_path else "",
-                            "report_file": report_name,
-                            "report": report_meta,
-                        }
-                    )
-        except OSError:
-            continue
+    project = trend_file.parent.name
+    # Relative report paths are stored relative to the repo root, two levels
+    # above <root>/<project>/trend.csv.
+    repo_root = trend_file.parent.parent.parent
+    try:
+        with trend_file.open(
+            "r", encoding="utf-8", newline="", buffering=TREND_READ_BUFFER
+        ) as handle:
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if header is None:
+                return rows
+            width = len(header)
+            columns = {name: index for index, name in enumerate(header)}
+            # Columns absent from this file's header read the trailing blank cell.
+            (
+                i_date,
+                i_source,
+                i_session_id,
+                i_session_reference_id,
+                i_total_tokens,
+                i_input_tokens,
+                i_output_tokens,
+                i_tool_calls,
+                i_retry_loops,
+                i_efficiency,
+                i_reliability,
+                i_composite,
+                i_estimated_cost_usd,
+                i_report_path,
+            ) = (
+                columns.get(name, width)
+                for name in (
+                    "date",
+                    "source",
+                    "session_id",
+                    "session_reference_id",
+                    "total_tokens",
+                    "input_tokens",
+                    "output_tokens",
+                    "tool_calls",
+                    "retry_loops",
+                    "efficiency",
+                    "reliability",
+                    "composite",
+                    "estimated_cost_usd",
+                    "report_path",
+                )
+            )
+            blanks = [""] * width
+            for item in reader:
+                if not item:
+                    continue
+                if len(item) != width:
+                    # Like DictReader: pad short rows and ignore extra fields.
+                    item = (item + blanks)[:width]
+                item.append("")
+
+                report_path = resolve_report_path(repo_root, item[i_report_path].strip())
+                if report_path:
+                    report_meta = report_cache.get(report_path)
+                    if report_meta is None:
+                        report_meta = report_cache[report_path] = read_json_report(report_path)
+                else:
+                    report_meta = {}
+
+                session_id = item[i_session_id].strip()
+                session_reference_id = item[i_session_reference_id].strip()
+                source = item[i_source].strip() or report_meta.get("source", "unknown")
+                date_value = item[i_date].strip()
+                report_name = report_path.name if report_path else ""
+
+                rows.append(
+                    {
+                        "project": project,
+                        "date": date_value,
+                        "source": source,
+                        "session_id": session_id,
+                        "session_reference_id": session_reference_id,
+                        "total_tokens": to_int(item[i_total_tokens], 0),
+                        "input_tokens": to_int(item[i_input_tokens], 0),
+                        "output_tokens": to_int(item[i_output_tokens], 0),
+                        "tool_calls": to_int(item[i_tool_calls], 0),
+                        "retry_loops": to_int(item[i_retry_loops], 0),
+                        "efficiency": to_float(item[i_efficiency], 0.0),
+                        "reliability": to_float(item[i_reliability], 0.0),
+                        "composite": to_float(item[i_composite], 0.0),
+                        "estimated_cost_usd": to_float(item[i_estimated_cost_usd], 0.0),
+                        "report_path": str(report_path) if report_path else "",
+                        "report_file": report_name,
+                        "top_rec_action": report_meta.get("top_rec_action", ""),
+                        "top_rec_impact": report_meta.get("top_rec_impact", ""),
+                    }
+                )
+    except OSError:
+        pass
     return rows
 
 
-def date_sort_key(item: Dict[str, Any]) -> str:
-    path_hint = item.get("report_file", "")
-    return f"{item.get('date', '')} {path_hint}"
+def load_rows(root: Path) -> List[Dict[str, Any]]:
+    trend_files = list(_iter_trend_files(root))
+    if not trend_files:
+        return []
+    # Several trend rows often point at the same report; parse each file once.
+    report_cache: Dict[Path, Dict[str, Any]] = {}
+    # Loading is dominated by file reads, so threads overlap the I/O waits.
+    # map() keeps results in trend-file order.
+    workers = min(len(trend_files), (os.cpu_count() or 1) * 4)
+    rows: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for file_rows in pool.map(
+            functools.partial(_load_trend_file, report_cache=report_cache),
+            trend_files,
+        ):
+            rows.extend(file_rows)
+    return rows
 
 
-def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
-    payload = json.dumps({"rows": rows, "generated_at": generated_at}, ensure_ascii=True)
-    return f"""<!doctype html>
+HTML_TEMPLATE = """<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8" />
   <meta name="viewport" content="width=device-width, initial-scale=1" />
   <title>Session Review Dashboard</title>
   <style>
-    :root {{
+    :root {
       --bg: #f4f0e6;
       --panel: #fffaf2;
       --ink: #13213a;
@@ -179,9 +256,9 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
       --good: #2a9d8f;
       --mono: "IBM Plex Mono", "SFMono-Regular", Menlo, Monaco, Consolas, monospace;
       --sans: "Manrope", "Avenir Next", "Segoe UI", sans-serif;
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
+    }
+    * { box-sizing: border-box; }
+    body {
       margin: 0;
       font-family: var(--sans);
       color: var(--ink);
@@ -190,36 +267,36 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
         radial-gradient(1200px 700px at 100% -20%, #cdebf6 0%, transparent 45%),
         var(--bg);
       min-height: 100vh;
-    }}
-    .wrap {{
+    }
+    .wrap {
       max-width: 1200px;
       margin: 24px auto 40px;
       padding: 0 16px;
       animation: fadeUp .4s ease-out both;
-    }}
-    @keyframes fadeUp {{
-      from {{ opacity: 0; transform: translateY(10px); }}
-      to {{ opacity: 1; transform: translateY(0); }}
-    }}
-    .header {{
+    }
+    @keyframes fadeUp {
+      from { opacity: 0; transform: translateY(10px); }
+      to { opacity: 1; transform: translateY(0); }
+    }
+    .header {
       display: flex;
       justify-content: space-between;
       align-items: flex-end;
       gap: 16px;
       margin-bottom: 16px;
-    }}
-    .title {{
+    }
+    .title {
       margin: 0;
       font-size: 2rem;
       line-height: 1.1;
       letter-spacing: -0.02em;
-    }}
-    .meta {{
+    }
+    .meta {
       margin-top: 6px;
       color: var(--muted);
       font-size: 0.9rem;
-    }}
-    .controls {{
+    }
+    .controls {
       background: var(--panel);
       border: 1px solid var(--line);
       border-radius: 12px;
@@ -228,102 +305,102 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
       flex-wrap: wrap;
       gap: 10px;
       margin-bottom: 14px;
-    }}
-    .controls label {{
+    }
+    .controls label {
       font-size: 0.8rem;
       color: var(--muted);
       display: flex;
       flex-direction: column;
       gap: 4px;
-    }}
-    select, input {{
+    }
+    select, input {
       font: inherit;
       border: 1px solid #bcae8f;
       border-radius: 8px;
       padding: 7px 9px;
       background: #fff;
       min-width: 150px;
-    }}
-    .grid {{
+    }
+    .grid {
       display: grid;
       gap: 12px;
       grid-template-columns: repeat(12, 1fr);
       margin-bottom: 12px;
-    }}
-    .card {{
+    }
+    .card {
       grid-column: span 3;
       background: var(--panel);
       border: 1px solid var(--line);
       border-radius: 12px;
       padding: 12px;
-    }}
-    .k {{
+    }
+    .k {
       font-size: 0.8rem;
       color: var(--muted);
       margin-bottom: 8px;
       text-transform: uppercase;
       letter-spacing: .04em;
-    }}
-    .v {{
+    }
+    .v {
       font-family: var(--mono);
       font-size: 1.45rem;
       font-weight: 700;
-    }}
-    .v.good {{ color: var(--good); }}
-    .v.warn {{ color: var(--warning); }}
-    .panel {{
+    }
+    .v.good { color: var(--good); }
+    .v.warn { color: var(--warning); }
+    .panel {
       background: var(--panel);
       border: 1px solid var(--line);
       border-radius: 12px;
       padding: 12px;
       margin-bottom: 12px;
-    }}
-    .panel h2 {{
+    }
+    .panel h2 {
       margin: 0 0 10px;
       font-size: 1rem;
-    }}
-    .bars {{
+    }
+    .bars {
       display: grid;
       gap: 8px;
-    }}
-    .bar-row {{
+    }
+    .bar-row {
       display: grid;
       grid-template-columns: 140px 1fr 70px;
       gap: 8px;
       align-items: center;
       font-size: .9rem;
-    }}
-    .bar-track {{
+    }
+    .bar-track {
       background: #e8dfcd;
       height: 12px;
       border-radius: 999px;
       overflow: hidden;
-    }}
-    .bar-fill {{
+    }
+    .bar-fill {
       background: linear-gradient(90deg, var(--accent), var(--accent-soft));
       height: 100%;
       width: 0;
       transition: width .25s ease;
-    }}
-    table {{
+    }
+    table {
       width: 100%;
       border-collapse: collapse;
       font-size: .88rem;
-    }}
-    th, td {{
+    }
+    th, td {
       border-bottom: 1px solid #e4dac6;
       text-align: left;
       padding: 7px 5px;
       vertical-align: top;
-    }}
-    th {{
+    }
+    th {
       font-size: .74rem;
       color: var(--muted);
       text-transform: uppercase;
       letter-spacing: .04em;
-    }}
-    .mono {{ font-family: var(--mono); }}
-    .pill {{
+    }
+    .mono { font-family: var(--mono); }
+    .pill {
       display: inline-block;
       border-radius: 999px;
       padding: 2px 7px;
@@ -331,18 +408,18 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
       font-weight: 600;
       background: #d9ecef;
       color: #10485f;
-    }}
-    .hint {{ color: var(--muted); font-size: .84rem; }}
-    @media (max-width: 1000px) {{
-      .card {{ grid-column: span 6; }}
-      .bar-row {{ grid-template-columns: 105px 1fr 58px; }}
-    }}
-    @media (max-width: 640px) {{
-      .header {{ flex-direction: column; align-items: flex-start; }}
-      .card {{ grid-column: span 12; }}
-      .controls label {{ width: 100%; }}
-      select, input {{ width: 100%; }}
-    }}
+    }
+    .hint { color: var(--muted); font-size: .84rem; }
+    @media (max-width: 1000px) {
+      .card { grid-column: span 6; }
+      .bar-row { grid-template-columns: 105px 1fr 58px; }
+    }
+    @media (max-width: 640px) {
+      .header { flex-direction: column; align-items: flex-start; }
+      .card { grid-column: span 12; }
+      .controls label { width: 100%; }
+      select, input { width: 100%; }
+    }
   </style>
 </head>
 <body>
@@ -415,16 +492,16 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
   </div>
 
   <script>
-    const DATA = {payload};
+    const DATA = __PAYLOAD__;
 
     const fmtInt = (n) => new Intl.NumberFormat().format(Number(n || 0));
     const fmt1 = (n) => Number(n || 0).toFixed(1);
     const byNewest = (a, b) => (a.sort_key < b.sort_key ? 1 : -1);
 
-    const rows = (DATA.rows || []).map(r => ({{
+    const rows = (DATA.rows || []).map(r => ({
       ...r,
-      sort_key: `${{r.date || ''}} ${{r.report_file || ''}}`
-    }})).sort(byNewest);
+      sort_key: `${r.date || ''} ${r.report_file || ''}`
+    })).sort(byNewest);
 
     const projectFilter = document.getElementById('projectFilter');
     const sourceFilter = document.getElementById('sourceFilter');
@@ -433,21 +510,21 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
     const meta = document.getElementById('meta');
 
     const projects = ['all', ...Array.from(new Set(rows.map(r => r.project))).sort()];
-    for (const project of projects) {{
+    for (const project of projects) {
       const opt = document.createElement('option');
       opt.value = project;
       opt.textContent = project;
       projectFilter.appendChild(opt);
-    }}
+    }
     const sources = Array.from(new Set(rows.map(r => r.source))).filter(Boolean).sort();
-    for (const src of sources) {{
+    for (const src of sources) {
       const opt = document.createElement('option');
       opt.value = src;
       opt.textContent = src;
       sourceFilter.appendChild(opt);
-    }}
+    }
 
-    const pickRows = () => {{
+    const pickRows = () => {
       const p = projectFilter.value;
       const s = sourceFilter.value;
       const min = Number(minComposite.value || 0);
@@ -456,9 +533,9 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
         (s === 'all' || r.source === s) &&
         Number(r.composite || 0) >= min
       );
-    }};
+    };
 
-    function render() {{
+    function render() {
       const picked = pickRows();
       const limited = picked.slice(0, Number(rowLimit.value || 50));
       const totalTokens = picked.reduce((a, r) => a + Number(r.total_tokens || 0), 0);
@@ -470,79 +547,78 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
 
       const c = document.getElementById('kComposite');
       c.textContent = fmt1(avgComposite);
-      c.className = `v mono ${{avgComposite >= 70 ? 'good' : avgComposite < 40 ? 'warn' : ''}}`;
+      c.className = `v mono ${avgComposite >= 70 ? 'good' : avgComposite < 40 ? 'warn' : ''}`;
 
       const e = document.getElementById('kEfficiency');
       e.textContent = fmt1(avgEfficiency);
-      e.className = `v mono ${{avgEfficiency >= 70 ? 'good' : avgEfficiency < 40 ? 'warn' : ''}}`;
+      e.className = `v mono ${avgEfficiency >= 70 ? 'good' : avgEfficiency < 40 ? 'warn' : ''}`;
 
-      meta.textContent = `${{picked.length}} filtered rows | generated ${{DATA.generated_at}}`;
+      meta.textContent = `${picked.length} filtered rows | generated ${DATA.generated_at}`;
 
       const byProject = new Map();
-      for (const row of picked) {{
+      for (const row of picked) {
         const prev = byProject.get(row.project) || 0;
         byProject.set(row.project, prev + Number(row.total_tokens || 0));
-      }}
+      }
       const projItems = Array.from(byProject.entries()).sort((a, b) => b[1] - a[1]).slice(0, 12);
       const maxTokens = Math.max(1, ...projItems.map(x => x[1]));
       const projectBars = document.getElementById('projectBars');
       projectBars.innerHTML = '';
-      for (const [project, tokens] of projItems) {{
+      for (const [project, tokens] of projItems) {
         const row = document.createElement('div');
         row.className = 'bar-row';
         row.innerHTML = `
-          <div class="mono">${{project}}</div>
-          <div class="bar-track"><div class="bar-fill" style="width:${{(tokens / maxTokens) * 100}}%"></div></div>
-          <div class="mono">${{fmtInt(tokens)}}</div>
+          <div class="mono">${project}</div>
+          <div class="bar-track"><div class="bar-fill" style="width:${(tokens / maxTokens) * 100}%"></div></div>
+          <div class="mono">${fmtInt(tokens)}</div>
         `;
         projectBars.appendChild(row);
-      }}
+      }
 
       const sessionsBody = document.getElementById('sessionsBody');
       sessionsBody.innerHTML = '';
-      for (const row of limited) {{
+      for (const row of limited) {
         const tr = document.createElement('tr');
         tr.innerHTML = `
-          <td class="mono">${{row.date || ''}}</td>
-          <td>${{row.project}}</td>
-          <td><span class="pill">${{row.source || 'unknown'}}</span></td>
-          <td class="mono">${{fmtInt(row.total_tokens)}}</td>
-          <td class="mono">${{fmt1(row.composite)}}</td>
-          <td class="mono">${{fmtInt(row.tool_calls)}}</td>
-          <td class="mono">${{fmtInt(row.retry_loops)}}</td>
-          <td class="mono">${{row.session_reference_id || row.session_id || ''}}</td>
+          <td class="mono">${row.date || ''}</td>
+          <td>${row.project}</td>
+          <td><span class="pill">${row.source || 'unknown'}</span></td>
+          <td class="mono">${fmtInt(row.total_tokens)}</td>
+          <td class="mono">${fmt1(row.composite)}</td>
+          <td class="mono">${fmtInt(row.tool_calls)}</td>
+          <td class="mono">${fmtInt(row.retry_loops)}</td>
+          <td class="mono">${row.session_reference_id || row.session_id || ''}</td>
         `;
         sessionsBody.appendChild(tr);
-      }}
+      }
 
       const recRows = [];
-      for (const row of picked) {{
-        const rec = (row.report && row.report.recommendations && row.report.recommendations[0]) || null;
-        if (!rec || !rec.action) continue;
-        recRows.push({{
+      for (const row of picked) {
+        if (!row.top_rec_action) continue;
+        recRows.push({
           date: row.date || '',
           project: row.project,
           source: row.source || '',
-          action: rec.action,
-          impact: rec.expected_impact || '',
+          action: row.top_rec_action,
+          impact: row.top_rec_impact || '',
           sort_key: row.sort_key
-        }});
-      }}
+        });
+      }
       recRows.sort((a, b) => a.sort_key < b.sort_key ? 1 : -1);
       const recsBody = document.getElementById('recsBody');
       recsBody.innerHTML = '';
-      for (const rec of recRows.slice(0, 20)) {{
+      for (const rec of recRows.slice(0, 20)) {
         const tr = document.createElement('tr');
         tr.innerHTML = `
-          <td class="mono">${{rec.date}}</td>
-          <td>${{rec.project}}</td>
-          <td><span class="pill">${{rec.source}}</span></td>
-          <td>${{rec.action}}</td>
-          <td class="mono">${{rec.impact}}</td>
+          <td class="mono">${rec.date}</td>
+          <td>${rec.project}</td>
+          <td><span class="pill">${rec.source}</span></td>
+          <td>${rec.action}</td>
+          <td class="mono">${rec.impact}</td>
         `;
         recsBody.appendChild(tr);
-      }}
-    }}
+      }
+    }
 
     projectFilter.addEventListener('change', render);
     sourceFilter.addEventListener('change', render);
@@ -553,6 +629,30 @@ def build_html(rows: List[Dict[str, Any]], generated_at: str) -> str:
 </body>
 </html>
 """
+# Pre-encoded page halves around the payload, so the JSON can be written
+# between them without splicing it into one large buffer.
+HTML_HEAD, HTML_TAIL = (
+    part.encode("utf-8") for part in HTML_TEMPLATE.split("__PAYLOAD__", 1)
+)
+
+
+def encode_payload(obj: Any) -> bytes:
+    """Compact UTF-8 JSON via orjson when installed, stdlib otherwise."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson rejects some payloads json accepts (e.g. >64-bit ints).
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_html(out_path: Path, rows: List[Dict[str, Any]], generated_at: str) -> None:
+    payload = encode_payload({"rows": rows, "generated_at": generated_at})
+    with out_path.open("wb") as handle:
+        handle.write(HTML_HEAD)
+        handle.write(payload)
+        handle.write(HTML_TAIL)
 
 
 def main() -> int:
@@ -565,12 +665,12 @@ def main() -> int:
     out_path = Path(args.out).resolve() if args.out else root / "dashboard.html"
 
     rows = load_rows(root)
-    rows.sort(key=date_sort_key, reverse=True)
+    # Tuple key orders like the former "<date> <report_file>" string without
+    # building one per row.
+    rows.sort(key=itemgetter("date", "report_file"), reverse=True)
     generated_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
-    html = build_html(rows, generated_at)
-
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(html, encoding="utf-8")
+    write_html(out_path, rows, generated_at)
     print(f"Dashboard written: {out_path}")
     print(f"Rows indexed: {len(rows)}")
     return 0